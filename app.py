@@ -1,8 +1,10 @@
 from __future__ import annotations
 
 import io
+import json
+import os
 from pathlib import Path
-from typing import List, Tuple
+from typing import Hashable, List, Tuple
 
 import pandas as pd
 import streamlit as st
@@ -40,8 +42,14 @@ from usage_intelligence.analysis import (
     compute_all_flags,
     compute_scores,
     ensure_unique_event_id,
+    flag_frame,
+    flag_view,
     parse_timestamps,
 )
+from usage_intelligence.baseline import OperatorBaseline
+from usage_intelligence.event_store import EventStore
+from usage_intelligence.history import HistoryStore, _stage
+from usage_intelligence.sketches import DailySketches, PartitionSketch
 from usage_intelligence.visualization import (
     behaviour_timeline,
     device_heatmap,
@@ -79,6 +87,18 @@ REQUIRED_COLUMNS: List[str] = [
     "Test_Type",
 ]
 
+# Directory of the optional persistent history store (see history_section).
+HISTORY_DIR = Path(os.environ.get("POCTIFY_HISTORY_DIR", "history"))
+# Scope of the approximate-mode cards and tables (see approximate_controls).
+APPROXIMATE_SCOPE = (
+    "Covers the selected dates across the whole upload; the operator, device, "
+    "location, test type and minimum score filters are not applied."
+)
+# Persistent operator baseline and the fingerprints of uploads folded into
+# it (see baseline_deviations).
+BASELINE_PATH = HISTORY_DIR / "operator_baseline.npz"
+BASELINE_UPLOADS_PATH = HISTORY_DIR / "operator_baseline_uploads.json"
+
 st.set_page_config(page_title="POCTIFY Usage Intelligence", layout="wide")
 
 # ---------------------------------------------------------------------------
@@ -104,8 +124,23 @@ def validate_columns(df: pd.DataFrame, required: List[str]) -> None:
     if missing:
         raise ValueError(f"Missing required columns: {', '.join(missing)}")
 
+@st.cache_resource(show_spinner="Indexing upload...", max_entries=2)
+def load_event_store(dataset_key: Hashable, _uploaded: io.BytesIO) -> EventStore:
+    """Read, validate and index an upload once per dataset.
+
+    Building the store sorts and indexes every row, so it is cached on
+    ``dataset_key`` (the uploaded file) rather than rebuilt on each rerun;
+    ``_uploaded`` is excluded from hashing and at most two uploads are
+    kept. Errors propagate to the caller and are not cached.
+    """
+    df = read_uploaded_file(_uploaded)
+    validate_columns(df, REQUIRED_COLUMNS)
+    df = parse_timestamps(df)
+    df = ensure_unique_event_id(df)
+    return EventStore(df)
+
 def apply_filters(
-    df: pd.DataFrame,
+    store: EventStore,
     *,
     operator_ids: List[str] | None = None,
     locations: List[str] | None = None,
@@ -114,28 +149,26 @@ def apply_filters(
     date_range: Tuple[pd.Timestamp, pd.Timestamp] | None = None,
     min_score: int = 0,
 ) -> pd.DataFrame:
-    """Apply sidebar filters to the dataframe and return the subset.
+    """Apply sidebar filters to the event store and return the subset.
 
     The filters mirror the sidebar widgets allowing users to narrow the
     dataset by operator, location, device or test type. Date ranges are
-    compared against the parsed timestamp column. A minimum suspicion
-    score can be supplied to focus on high risk operators only.
+    inclusive of both end dates and are resolved by binary search over the
+    store's sorted timestamps rather than by scanning every row. A minimum
+    suspicion score can be supplied to focus on high risk operators only.
     """
-    data = df.copy()
-    if operator_ids:
-        data = data[data["Operator_ID"].isin(operator_ids)]
-    if locations:
-        data = data[data["Location"].isin(locations)]
-    if devices:
-        data = data[data["Device_ID"].isin(devices)]
-    if test_types:
-        data = data[data["Test_Type"].isin(test_types)]
+    start = end = None
     if date_range and len(date_range) == 2:
         start, end = date_range
-        data = data[
-            (data["Timestamp"].dt.date >= start)
-            & (data["Timestamp"].dt.date <= end)
-        ]
+        end = pd.Timestamp(end) + pd.Timedelta(days=1)
+    data = store.select(
+        start,
+        end,
+        Operator_ID=operator_ids,
+        Location=locations,
+        Device_ID=devices,
+        Test_Type=test_types,
+    )
     if min_score:
         scores = compute_scores(data)
         keep_ops = scores[scores["Suspicion_Score"] >= min_score]["Operator_ID"]
@@ -161,7 +194,7 @@ def sidebar_instructions() -> None:
             """
         )
 
-def sidebar_controls(df: pd.DataFrame) -> Tuple[pd.DataFrame, int, int, int]:
+def sidebar_controls(store: EventStore) -> Tuple[pd.DataFrame, int, int, int]:
     """Render sidebar widgets and return filtered data and thresholds."""
     st.sidebar.header("Upload Data")
     suspicion_window = st.sidebar.slider(
@@ -175,32 +208,34 @@ def sidebar_controls(df: pd.DataFrame) -> Tuple[pd.DataFrame, int, int, int]:
     )
     st.sidebar.markdown("### 🔍 Filter Options")
     operator_ids = st.sidebar.multiselect(
-        "Operator ID", options=sorted(df["Operator_ID"].dropna().unique())
+        "Operator ID", options=store.keys("Operator_ID")
     )
     locations = st.sidebar.multiselect(
-        "Location", options=sorted(df["Location"].dropna().unique())
+        "Location", options=store.keys("Location")
     )
     devices = st.sidebar.multiselect(
-        "Device ID", options=sorted(df["Device_ID"].dropna().unique())
+        "Device ID", options=store.keys("Device_ID")
     )
     test_types = st.sidebar.multiselect(
-        "Test Type", options=sorted(df["Test_Type"].dropna().unique())
+        "Test Type", options=store.keys("Test_Type")
     )
     # Dates default to min/max in data
-    if not df.empty:
+    if len(store):
         date_range = st.sidebar.date_input(
             "Date Range",
-            [df["Timestamp"].min().date(), df["Timestamp"].max().date()],
+            [store.start.date(), store.end.date()],
+            key="date_range",
         )
     else:
         import datetime
         date_range = st.sidebar.date_input(
             "Date Range",
             [datetime.date.today(), datetime.date.today()],
+            key="date_range",
         )
     min_score = st.sidebar.slider("Min Suspicion Score", 0, 100, 10)
     filtered = apply_filters(
-        df,
+        store,
         operator_ids=operator_ids,
         locations=locations,
         devices=devices,
@@ -210,6 +245,61 @@ def sidebar_controls(df: pd.DataFrame) -> Tuple[pd.DataFrame, int, int, int]:
     )
     return filtered, suspicion_window, share_threshold, rapid_threshold
 
+@st.cache_resource(show_spinner="Building daily sketches...", max_entries=2)
+def build_daily_sketches(
+    dataset_key: Hashable,
+    _events: pd.DataFrame,
+    rapid_th: int,
+    hop_threshold: int,
+    window_minutes: int,
+) -> DailySketches:
+    """Sketch every day of the full upload once per dataset and thresholds.
+
+    The cache is keyed on ``dataset_key`` (the uploaded file) and the flag
+    thresholds only; ``_events`` is excluded from hashing. View filters do
+    not invalidate it, and at most two datasets are kept.
+    """
+    columns = [c for c in ("Timestamp", "Operator_ID", "Device_ID", "Location", "Barcode") if c in _events.columns]
+    flagged = compute_all_flags(
+        _events[columns],
+        rapid_th=rapid_th,
+        hop_threshold=hop_threshold,
+        window_minutes=window_minutes,
+        low_memory=True,
+    )
+    return DailySketches(flagged)
+
+def approximate_controls(
+    store: EventStore,
+    dataset_key: Hashable,
+    thresholds: Tuple[int, int, int],
+) -> PartitionSketch | None:
+    """Offer approximate aggregates for very large histories.
+
+    Returns the per-day sketches of the whole upload merged over the
+    sidebar date range, or ``None`` when exact aggregates should be shown.
+    The "Recompute exactly" button falls back to exact ``groupby``
+    aggregates for the current run.
+    """
+    approximate = st.sidebar.checkbox(
+        "Approximate mode",
+        help="Estimate the summary cards and the device and location tables "
+        "from per-day HyperLogLog / Count-Min sketches of the whole upload. "
+        "The sketches are built once per upload and thresholds (an extra "
+        "flagging pass); the rest of the page is still computed exactly. "
+        "Error bounds are shown next to each table.",
+    )
+    if not approximate or not len(store):
+        return None
+    st.sidebar.caption(APPROXIMATE_SCOPE)
+    if st.sidebar.button("Recompute exactly"):
+        return None
+    sketches = build_daily_sketches(dataset_key, store.frame, *thresholds)
+    date_range = st.session_state.get("date_range")
+    if date_range and len(date_range) == 2:
+        return sketches.merged(*date_range)
+    return sketches.merged()
+
 # ---------------------------------------------------------------------------
 # MAIN DISPLAY FUNCTIONS
 # ---------------------------------------------------------------------------
@@ -217,11 +307,13 @@ def sidebar_controls(df: pd.DataFrame) -> Tuple[pd.DataFrame, int, int, int]:
 def operator_overview(df: pd.DataFrame) -> None:
     """Display operator table and suspicion scores."""
     st.subheader("Operator Overview & Risk Scoring")
-    stats = df.groupby("Operator_ID").agg(
-        Event_Count=("Event_ID", "count"),
-        Flagged_Count=("Flagged", "sum"),
+    stats = df.groupby("Operator_ID").agg(Event_Count=("Event_ID", "count"))
+    flag_breakdown = (
+        flag_frame(df)
+        .groupby(df["Operator_ID"])
+        .sum()
+        .rename(columns={"Flagged": "Flagged_Count"})
     )
-    flag_breakdown = df.groupby("Operator_ID")[FLAG_COLUMNS].sum()
     stats = stats.join(flag_breakdown)
     stats["Suspicion_Score"] = (
         stats["Flagged_Count"] * 2
@@ -233,33 +325,63 @@ def operator_overview(df: pd.DataFrame) -> None:
     st.dataframe(stats, use_container_width=True)
     st.bar_chart(stats["Suspicion_Score"], use_container_width=True)
 
-def device_overview(df: pd.DataFrame) -> None:
-    """Display device-centric statistics."""
+def approximate_caption(errors: dict) -> None:
+    """Describe the error bounds of an approximate overview table."""
+    parts = []
+    for column, error in errors.items():
+        if column in ("Event_Count", "Flagged_Count"):
+            parts.append(f"{column} overcounts by ≤{error:,.0f} (98% confidence)")
+        else:
+            parts.append(f"{column} ±{error:.1%} (std. error)")
+    st.caption("Approximate values: " + "; ".join(parts) + ". " + APPROXIMATE_SCOPE)
+
+def device_overview(df: pd.DataFrame, sketch: PartitionSketch | None = None) -> None:
+    """Display device-centric statistics.
+
+    When ``sketch`` is supplied (approximate mode) the table is built from
+    merged per-day sketches instead of an exact ``groupby``.
+    """
     st.subheader("Device Overview & Risk Scoring")
-    stats = df.groupby("Device_ID").agg(
-        Event_Count=("Event_ID", "count"),
-        Flagged_Count=("Flagged", "sum"),
-        Operator_Count=("Operator_ID", "nunique"),
-    )
+    if sketch is not None:
+        stats = sketch.group_summary("Device_ID")[
+            ["Event_Count", "Flagged_Count", "Operator_Count"]
+        ]
+    else:
+        stats = df.groupby("Device_ID").agg(
+            Event_Count=("Event_ID", "count"),
+            Operator_Count=("Operator_ID", "nunique"),
+        )
+        flagged = flag_view(df, "Flagged").groupby(df["Device_ID"]).sum()
+        stats.insert(1, "Flagged_Count", flagged)
     stats["Device_Risk_Score"] = (
         stats["Flagged_Count"] * 2 + stats["Operator_Count"] * 1.5
     )
     stats = stats.sort_values("Device_Risk_Score", ascending=False)
     st.dataframe(stats, use_container_width=True)
+    if sketch is not None:
+        approximate_caption(sketch.group_errors("Device_ID"))
     st.bar_chart(stats["Device_Risk_Score"], use_container_width=True)
 
-def location_overview(df: pd.DataFrame) -> None:
+def location_overview(df: pd.DataFrame, sketch: PartitionSketch | None = None) -> None:
     """Show location-based activity summaries if location column exists."""
     if "Location" not in df.columns:
         return
     st.subheader("Location Activity")
-    stats = df.groupby("Location").agg(
-        Event_Count=("Event_ID", "count"),
-        Flagged_Count=("Flagged", "sum"),
-        Operator_Count=("Operator_ID", "nunique"),
-        Device_Count=("Device_ID", "nunique"),
-    )
+    if sketch is not None:
+        stats = sketch.group_summary("Location")[
+            ["Event_Count", "Flagged_Count", "Operator_Count", "Device_Count"]
+        ]
+    else:
+        stats = df.groupby("Location").agg(
+            Event_Count=("Event_ID", "count"),
+            Operator_Count=("Operator_ID", "nunique"),
+            Device_Count=("Device_ID", "nunique"),
+        )
+        flagged = flag_view(df, "Flagged").groupby(df["Location"]).sum()
+        stats.insert(1, "Flagged_Count", flagged)
     st.dataframe(stats, use_container_width=True)
+    if sketch is not None:
+        approximate_caption(sketch.group_errors("Location"))
     st.bar_chart(stats["Event_Count"], use_container_width=True)
 
 def temporal_trends(df: pd.DataFrame) -> None:
@@ -293,10 +415,126 @@ def distributions_and_outliers(df: pd.DataFrame) -> None:
     outliers = op_stats[op_stats > cutoff]
     st.dataframe(outliers, use_container_width=True)
 
+def _load_baseline() -> Tuple[OperatorBaseline, List[str]]:
+    """Stored operator baseline and the fingerprints of uploads in it."""
+    if not BASELINE_PATH.is_file():
+        return OperatorBaseline(), []
+    uploads = json.loads(BASELINE_UPLOADS_PATH.read_text()) if BASELINE_UPLOADS_PATH.is_file() else []
+    return OperatorBaseline.load(BASELINE_PATH), uploads
+
+def _upload_fingerprint(events: pd.DataFrame) -> str:
+    """Content hash of an upload, independent of row order."""
+    columns = [c for c in ("Timestamp", "Operator_ID", "Device_ID", "Location") if c in events.columns]
+    return format(int(pd.util.hash_pandas_object(events[columns], index=False).sum()), "016x")
+
+@st.cache_resource(show_spinner="Scoring against operator baselines...", max_entries=2)
+def score_against_baseline(
+    dataset_key: Hashable, _events: pd.DataFrame
+) -> Tuple[pd.DataFrame, bool]:
+    """Score an upload against the stored baseline without changing it.
+
+    Events are judged against the behaviour learned from previously saved
+    uploads, not against themselves. The cache is keyed on
+    ``dataset_key`` with ``_events`` excluded from hashing, so the scores
+    keep referring to the prior state even after the upload is added to
+    the baseline (see ``save_to_baseline``).
+
+    Returns the scores and whether the upload was already in the baseline.
+    """
+    baseline, uploads = _load_baseline()
+    return baseline.score(_events), _upload_fingerprint(_events) in uploads
+
+def save_to_baseline(events: pd.DataFrame) -> bool:
+    """Fold an upload into the stored baseline; ``False`` if already in it.
+
+    Both files are staged before either replaces its live copy, so a
+    failed write leaves the stored baseline and its upload list unchanged
+    and the upload is not counted twice on the next attempt.
+    """
+    baseline, uploads = _load_baseline()
+    fingerprint = _upload_fingerprint(events)
+    if fingerprint in uploads:
+        return False
+    baseline.update(events)
+
+    def write_baseline(tmp: Path) -> None:
+        with open(tmp, "wb") as f:
+            baseline.save(f)
+
+    staged = []
+    try:
+        staged.append((_stage(BASELINE_PATH, write_baseline), BASELINE_PATH))
+        staged.append(
+            (
+                _stage(BASELINE_UPLOADS_PATH, lambda tmp: tmp.write_text(json.dumps(uploads + [fingerprint]))),
+                BASELINE_UPLOADS_PATH,
+            )
+        )
+    except Exception:
+        for tmp, _ in staged:
+            tmp.unlink(missing_ok=True)
+        raise
+    for tmp, path in staged:
+        os.replace(tmp, path)
+    return True
+
+def baseline_deviations(df: pd.DataFrame, upload: pd.DataFrame, dataset_key: Hashable) -> None:
+    """Highlight events that deviate from each operator's own baseline.
+
+    A per-operator baseline (hour-of-week profile, usual devices and
+    locations, inter-event interval distribution) is learned from the
+    uploads the user chose to add to it and stored next to the history
+    store. Every event of the upload is scored against that prior
+    baseline, independent of the sidebar filters; only the events in the
+    filtered view ``df`` are shown. The upload itself is only added to
+    the baseline when the user presses the sidebar button. Unlike the
+    global outlier cutoff above this catches, for example, a day-shift
+    operator testing at 3am on a device they never use.
+    """
+    with st.sidebar.expander("Operator Baseline", expanded=False):
+        st.caption(f"Store: {BASELINE_PATH}")
+        if st.button("Add upload to operator baseline"):
+            try:
+                added = save_to_baseline(upload)
+            except Exception as e:
+                st.error(f"Could not save the operator baseline (nothing was changed): {e}")
+            else:
+                if added:
+                    st.success("Upload added to the operator baseline.")
+                else:
+                    st.info("This upload is already part of the operator baseline.")
+    st.subheader("Deviations from Operator Baselines")
+    scores, already_saved = score_against_baseline(dataset_key, upload)
+    if scores["Hour_Share"].isna().all():
+        st.info(
+            "None of these operators are in the stored operator baseline yet. "
+            "Add uploads to it from the sidebar to score later uploads against "
+            "each operator's usual behaviour."
+        )
+        return
+    if already_saved:
+        st.caption(
+            "This upload is already part of the stored baseline, so its events "
+            "are scored against a baseline that includes them."
+        )
+    scores = scores.loc[df.index]
+    unusual = [c for c in scores.columns if c.startswith("Unusual_")]
+    per_operator = scores.groupby(df["Operator_ID"])[unusual + ["Baseline_Score"]].sum()
+    per_operator = per_operator.sort_values("Baseline_Score", ascending=False)
+    st.dataframe(per_operator, use_container_width=True)
+    flagged = scores["Baseline_Score"] > 0
+    st.write(f"{int(flagged.sum())} events deviate from their operator's baseline.")
+    st.dataframe(
+        df.loc[flagged, ["Timestamp", "Operator_ID", "Device_ID", "Location"]].join(
+            scores.loc[flagged]
+        ),
+        use_container_width=True,
+    )
+
 def flag_breakdown_table(df: pd.DataFrame) -> None:
     """Display a table summarising counts per flag type."""
     st.subheader("Flag Breakdown")
-    counts = pd.DataFrame(df[FLAG_COLUMNS].sum()).reset_index()
+    counts = pd.DataFrame(flag_frame(df)[FLAG_COLUMNS].sum()).reset_index()
     counts.columns = ["Flag", "Count"]
     st.dataframe(counts, use_container_width=True)
 
@@ -329,11 +567,77 @@ def download_plots(df: pd.DataFrame) -> None:
     )
 
 def drilldown_section(df: pd.DataFrame) -> None:
-    """Interactive timeline views for operators and devices."""
+    """Interactive timeline views for operators and devices.
+
+    An optional selector narrows each timeline to a single operator or
+    device of the flagged view.
+    """
     st.subheader("Operator Drilldown")
-    st.plotly_chart(timeline_plot(df, "Operator_ID"), use_container_width=True)
+    operators = sorted(df["Operator_ID"].dropna().unique(), key=str)
+    operator = st.selectbox("Operator", ["All"] + operators)
+    st.plotly_chart(
+        timeline_plot(df, "Operator_ID", None if operator == "All" else operator),
+        use_container_width=True,
+    )
     st.subheader("Device Drilldown")
-    st.plotly_chart(timeline_plot(df, "Device_ID"), use_container_width=True)
+    devices = sorted(df["Device_ID"].dropna().unique(), key=str)
+    device = st.selectbox("Device", ["All"] + devices)
+    st.plotly_chart(
+        timeline_plot(df, "Device_ID", None if device == "All" else device),
+        use_container_width=True,
+    )
+
+def history_section(events: EventStore, thresholds: Tuple[int, int, int]) -> None:
+    """Persist flagged events on request and chart operator score trends.
+
+    Events are only written when the user presses the sidebar button. The
+    whole upload is saved, not the filtered view, flagged with the current
+    ``thresholds`` (rapid, device share, window) so that stored partitions
+    and rollups describe complete days; each save rewrites just the day
+    partitions covered by the upload. The trend chart reads the three
+    rollup columns it needs for the last year rather than the full event
+    history.
+    """
+    rapid_th, hop_threshold, window_minutes = thresholds
+    store = HistoryStore(HISTORY_DIR)
+    with st.sidebar.expander("History", expanded=False):
+        st.caption(f"Store: {HISTORY_DIR}")
+        if st.button("Save flagged upload to history"):
+            try:
+                flagged = compute_all_flags(
+                    events.frame,
+                    rapid_th=rapid_th,
+                    hop_threshold=hop_threshold,
+                    window_minutes=window_minutes,
+                )
+                touched = store.append(flagged)
+            except Exception as e:
+                st.error(f"Could not save to history (nothing was changed): {e}")
+            else:
+                st.success(f"Saved {len(touched)} day(s) to history.")
+    days = store.days("rollups")
+    if not days:
+        return
+    st.subheader("Operator Score Trend (History)")
+    end = days[-1]
+    start = end - pd.Timedelta(days=365)
+    all_ops = sorted({str(op) for op in events.keys("Operator_ID")})
+    operators = st.multiselect("Operators", options=all_ops, default=all_ops[:5])
+    if not operators:
+        return
+    rollups = store.load_rollups(
+        start,
+        end,
+        operators=operators,
+        columns=["Date", "Operator_ID", "Suspicion_Score"],
+    )
+    if rollups.empty:
+        st.info("No stored history for the selected operators.")
+        return
+    trend = rollups.pivot_table(
+        index="Date", columns="Operator_ID", values="Suspicion_Score", aggfunc="sum"
+    )
+    st.line_chart(trend, use_container_width=True)
 
 def investigation_notes(df: pd.DataFrame) -> None:
     """Simple note-taking area allowing users to record observations."""
@@ -351,9 +655,11 @@ def about_section() -> None:
         st.markdown(
             """
             **POCTIFY Usage Intelligence** was created to help POCT managers
-            review device usage more efficiently. Future releases will include
-            automated shift pattern learning, QR code validation and direct
-            middleware integrations.
+            review device usage more efficiently. Operator baselines learn each
+            operator's usual shift pattern, devices and locations across
+            uploads, and each new upload is compared against them. Future
+            releases will include QR code validation and direct middleware
+            integrations.
             """
         )
 
@@ -364,7 +670,10 @@ def privacy_notice() -> None:
             """
             This tool processes anonymised audit data only. Do **not** upload
             patient names, medical record numbers or clinical results. Data is
-            analysed in-memory and not retained after the browser session.
+            analysed in-memory and not retained after the browser session
+            unless you explicitly save it to the local history store or add
+            it to the operator baseline (which keeps per-operator hour,
+            device and location profiles).
             """
         )
 
@@ -399,37 +708,47 @@ def main():
     if uploaded_file is None:
         st.info("Please upload a file to begin.")
         st.stop()
+    dataset_key = getattr(uploaded_file, "file_id", None) or (uploaded_file.name, uploaded_file.size)
     try:
-        df = read_uploaded_file(uploaded_file)
-        st.write("Columns in uploaded file:", df.columns.tolist())
-        validate_columns(df, REQUIRED_COLUMNS)
-        df = parse_timestamps(df)
-        df = ensure_unique_event_id(df)
+        store = load_event_store(dataset_key, uploaded_file)
     except Exception as e:
         st.error(f"Failed to process file: {e}")
         st.stop()
-
-    filtered, suspicion_window, share_threshold, rapid_threshold = sidebar_controls(df)
+    st.write("Columns in uploaded file:", store.frame.columns.tolist())
+    filtered, suspicion_window, share_threshold, rapid_threshold = sidebar_controls(store)
+    low_memory = st.sidebar.checkbox(
+        "Low-memory mode",
+        help="Annotate flags in place as a packed bitmask instead of copying "
+        "and sorting the data. Recommended for very large uploads.",
+    )
     flagged_df = compute_all_flags(
         filtered,
         rapid_th=rapid_threshold,
         hop_threshold=share_threshold,
         window_minutes=suspicion_window,
+        low_memory=low_memory,
     )
 
-    summary_cards(flagged_df)
+    sketch = approximate_controls(
+        store, dataset_key, (rapid_threshold, share_threshold, suspicion_window)
+    )
+    summary_cards(flagged_df, sketch)
+    if sketch is not None:
+        st.caption("Approximate summary. " + APPROXIMATE_SCOPE)
     flag_breakdown_table(flagged_df)
     probability_summary(flagged_df)
     st.subheader("Flagged Events Table")
-    st.dataframe(flagged_df[flagged_df["Flagged"]], use_container_width=True)
+    st.dataframe(flagged_df[flag_view(flagged_df, "Flagged")], use_container_width=True)
     operator_overview(flagged_df)
-    device_overview(flagged_df)
-    location_overview(flagged_df)
+    device_overview(flagged_df, sketch)
+    location_overview(flagged_df, sketch)
     temporal_trends(flagged_df)
     heatmaps(flagged_df)
     distributions_and_outliers(flagged_df)
+    baseline_deviations(flagged_df, store.frame, dataset_key)
     dashboard_charts(flagged_df)
     drilldown_section(flagged_df)
+    history_section(store, (rapid_threshold, share_threshold, suspicion_window))
     investigation_notes(flagged_df)
     export_buttons(flagged_df)
     download_plots(flagged_df)
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from usage_intelligence.baseline import OperatorBaseline
+
+
+def _office_hours(n=258, seed=0):
+    """``n`` events for one operator, spread over weekdays 08:00-17:00."""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range("2025-01-06", periods=60)
+    slots = [day + pd.Timedelta(hours=h) for day in days for h in range(8, 17)]
+    stamps = [slot + pd.Timedelta(minutes=int(m)) for slot, m in zip(slots[:n], rng.integers(0, 60, n))]
+    return pd.DataFrame(
+        {"Timestamp": stamps, "Operator_ID": "OP1", "Device_ID": "DEV001", "Location": "ED"}
+    )
+
+
+def _sunday_night():
+    return pd.DataFrame(
+        {
+            "Timestamp": [pd.Timestamp("2025-03-30 03:10")],
+            "Operator_ID": "OP1",
+            "Device_ID": "DEV001",
+            "Location": "ED",
+        }
+    )
+
+
+def test_unused_hour_is_unusual_out_of_sample():
+    baseline = OperatorBaseline().update(_office_hours())
+    assert baseline.score(_sunday_night())["Unusual_Hour"].all()
+    assert not baseline.score(_office_hours(seed=1))["Unusual_Hour"].any()
+
+
+def test_single_off_hours_event_is_unusual_in_sample():
+    events = pd.concat([_office_hours(), _sunday_night()], ignore_index=True)
+    scores = OperatorBaseline().update(events).score(events)
+    assert scores["Unusual_Hour"].tolist() == [False] * 258 + [True]
+
+
+def _mixed_events(n=5_000, seed=3):
+    rng = np.random.default_rng(seed)
+    seconds = np.sort(rng.choice(86400 * 120, n, replace=False))
+    return pd.DataFrame(
+        {
+            "Timestamp": pd.Timestamp("2025-01-01") + pd.to_timedelta(seconds, unit="s"),
+            "Operator_ID": [f"OP{i}" for i in rng.integers(0, 40, n)],
+            "Device_ID": [f"DEV{i}" for i in rng.integers(0, 12, n)],
+            "Location": [f"LOC{i}" for i in rng.integers(0, 6, n)],
+        }
+    )
+
+
+def test_chunked_updates_match_one_shot():
+    events = _mixed_events()
+    one_shot = OperatorBaseline().update(events)
+    chunked = OperatorBaseline()
+    for chunk in np.array_split(np.arange(len(events)), 7):
+        chunked.update(events.iloc[chunk])
+
+    n_ops = len(one_shot.operators)
+    assert one_shot.operators.codes == chunked.operators.codes
+    for name in ("hour_counts", "events", "last_seen", "interval_n", "interval_hist"):
+        np.testing.assert_array_equal(getattr(one_shot, name)[:n_ops], getattr(chunked, name)[:n_ops])
+    for name in ("interval_mean", "interval_m2"):
+        np.testing.assert_allclose(getattr(one_shot, name)[:n_ops], getattr(chunked, name)[:n_ops])
+    pd.testing.assert_frame_equal(one_shot.score(events), chunked.score(events))
+
+
+def test_ids_match_across_dtypes():
+    events = _mixed_events()
+    numeric = events.assign(Operator_ID=events["Operator_ID"].str[2:].astype(int))
+    baseline = OperatorBaseline().update(numeric)
+    scores = baseline.score(events.assign(Operator_ID=events["Operator_ID"].str[2:]))
+    assert scores["Hour_Share"].notna().all()
+
+
+def test_save_load_round_trip(tmp_path):
+    events = _mixed_events()
+    baseline = OperatorBaseline(min_events=10, hour_ratio=0.3).update(events)
+    path = tmp_path / "baseline.npz"
+    baseline.save(path)
+    restored = OperatorBaseline.load(path)
+
+    assert (restored.min_events, restored.hour_ratio) == (10, 0.3)
+    assert restored.operators.codes == baseline.operators.codes
+    pd.testing.assert_frame_equal(restored.score(events), baseline.score(events))
+    # A restored baseline keeps learning, including new operators.
+    extra = _mixed_events(n=500, seed=4).assign(Operator_ID="OP_NEW")
+    pd.testing.assert_frame_equal(
+        restored.update(extra).score(extra), baseline.update(extra).score(extra)
+    )
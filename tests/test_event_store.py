@@ -0,0 +1,29 @@
+import datetime
+
+import pandas as pd
+
+from usage_intelligence.event_store import EventStore
+
+
+def _events(tz=None):
+    stamps = pd.to_datetime(
+        ["2025-06-28 09:12", "2025-06-29 10:00", "2025-06-29 23:30", "2025-06-30 10:00"]
+    )
+    if tz:
+        stamps = stamps.tz_localize(tz)
+    return pd.DataFrame({"Timestamp": stamps, "Operator_ID": ["A", "B", "A", "A"]})
+
+
+def test_date_bounds_on_tz_aware_timestamps():
+    store = EventStore(_events("Europe/London"))
+    day = datetime.date(2025, 6, 29)
+    assert len(store.select(day, day + datetime.timedelta(days=1))) == 2
+    assert len(store.lookup("Operator_ID", "A", day)) == 2
+
+
+def test_select_matches_boolean_scan():
+    df = _events()
+    store = EventStore(df.sample(frac=1, random_state=0))
+    result = store.select("2025-06-29", None, Operator_ID=["A"])
+    expected = df[(df["Timestamp"] >= "2025-06-29") & (df["Operator_ID"] == "A")]
+    assert result["Timestamp"].tolist() == expected["Timestamp"].tolist()
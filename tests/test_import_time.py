@@ -0,0 +1,41 @@
+import subprocess
+import sys
+
+MODULES = [
+    "usage_intelligence.visualization",
+    "usage_intelligence.history",
+    "usage_intelligence.sketches",
+    "usage_intelligence.analysis",
+]
+
+# Cumulative import time budget in seconds; pandas dominates (~0.7s here).
+IMPORT_BUDGET = 3.0
+
+
+def _import_profile():
+    code = (
+        f"import {', '.join(MODULES)}\n"
+        "import sys\n"
+        "print(sorted(m for m in sys.modules if m.split('.')[0] in ('streamlit', 'plotly')))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # Top-level imports are unindented; their cumulative times sum to the total.
+        if cumulative.strip().isdigit() and not name.startswith("  "):
+            total_us += int(cumulative)
+    return result.stdout.strip(), total_us / 1e6
+
+
+def test_import_does_not_load_ui_libraries_and_stays_within_budget():
+    loaded, seconds = _import_profile()
+    assert loaded == "[]"
+    assert seconds < IMPORT_BUDGET, f"imports took {seconds:.2f}s"
@@ -0,0 +1,52 @@
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from usage_intelligence.analysis import FLAG_COLUMNS, compute_all_flags, flag_view
+
+# Peak traced allocation of low-memory flagging, as a multiple of the
+# frame's deep size. Measured at roughly 0.3x with object-dtype IDs.
+PEAK_BUDGET = 1.0
+
+
+def _events(n, seed=0):
+    """Synthetic log with distinct timestamps, so sort order is unambiguous."""
+    rng = np.random.default_rng(seed)
+    seconds = rng.choice(86400 * 300, n, replace=False)
+    df = pd.DataFrame(
+        {
+            "Timestamp": pd.Timestamp("2025-01-01") + pd.to_timedelta(seconds, unit="s"),
+            "Operator_ID": [f"OP{i}" for i in rng.integers(0, 200, n)],
+            "Device_ID": [f"DEV{i}" for i in rng.integers(0, 30, n)],
+            "Location": [f"LOC{i}" for i in rng.integers(0, 10, n)],
+            "Test_Type": "Glucose",
+        }
+    )
+    return df.astype({c: object for c in ["Operator_ID", "Device_ID", "Location", "Test_Type"]})
+
+
+def test_low_memory_peak_stays_within_budget():
+    df = _events(100_000)
+    size = df.memory_usage(deep=True).sum()
+    tracemalloc.start()
+    try:
+        compute_all_flags(df, low_memory=True)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    assert peak < PEAK_BUDGET * size, f"peak {peak / size:.2f}x frame size"
+
+
+def test_low_memory_flags_match_default_mode():
+    df = _events(2_000, seed=1)
+    # Dense enough within the 5-minute window to trigger every flag.
+    df["Timestamp"] = pd.Timestamp("2025-01-01") + pd.to_timedelta(
+        np.random.default_rng(2).choice(86400 * 2, len(df), replace=False), unit="s"
+    )
+    expected = compute_all_flags(df).set_index("Event_ID").sort_index()
+    low = compute_all_flags(df.copy(), low_memory=True).set_index("Event_ID").sort_index()
+    for column in FLAG_COLUMNS:
+        flags = flag_view(low, column)
+        assert expected[column].sum() > 0
+        pd.testing.assert_series_equal(flags, expected[column], check_names=False)
@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+
+from usage_intelligence.sketches import DailySketches
+
+
+def _events(n=20000, seed=1):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "Timestamp": pd.Timestamp("2024-01-01")
+            + pd.to_timedelta(rng.integers(0, 86400 * 120, n), unit="s"),
+            "Operator_ID": [f"OP{i}" for i in rng.integers(0, 400, n)],
+            "Device_ID": [f"D{i}" for i in rng.integers(0, 40, n)],
+            "Location": [f"L{i}" for i in rng.integers(0, 8, n)],
+            "Flagged": rng.random(n) < 0.1,
+        }
+    )
+
+
+def test_merged_date_range_matches_exact_within_bounds():
+    df = _events()
+    merged = DailySketches(df).merged("2024-02-01", "2024-02-29")
+    sub = df[(df["Timestamp"] >= "2024-02-01") & (df["Timestamp"] < "2024-03-01")]
+    assert merged.events == len(sub)
+    error = merged.distinct_error("Operator_ID")
+    assert abs(merged.distinct_count("Operator_ID") - sub["Operator_ID"].nunique()) <= 4 * error * sub["Operator_ID"].nunique()
+
+    summary = merged.group_summary("Device_ID")
+    exact = sub.groupby("Device_ID").agg(
+        Event_Count=("Flagged", "size"), Flagged_Count=("Flagged", "sum"), Operator_Count=("Operator_ID", "nunique")
+    )
+    joined = summary.join(exact, rsuffix="_exact")
+    bounds = merged.group_errors("Device_ID")
+    # Count-Min never undercounts.
+    assert (joined["Event_Count"] >= joined["Event_Count_exact"]).all()
+    assert (joined["Event_Count"] - joined["Event_Count_exact"] <= bounds["Event_Count"]).all()
+    relative = (joined["Operator_Count"] - joined["Operator_Count_exact"]).abs() / joined["Operator_Count_exact"]
+    assert relative.max() <= 4 * bounds["Operator_Count"]
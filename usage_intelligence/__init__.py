@@ -0,0 +1,6 @@
+"""POCTIFY Usage Intelligence.
+
+The analysis core (``analysis``, ``event_store``, ``sketches``, ``history``)
+imports only numpy and pandas. ``visualization`` loads streamlit and
+plotly lazily on first use.
+"""
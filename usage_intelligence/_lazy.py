@@ -0,0 +1,26 @@
+"""Deferred imports for heavy optional dependencies."""
+
+import importlib
+from types import ModuleType
+
+
+class LazyModule(ModuleType):
+    """Module proxy that imports ``name`` on first attribute access.
+
+    ``streamlit`` and ``plotly.express`` take a large share of cold-start
+    time. Binding them through this proxy keeps ``import`` of the plotting
+    helpers cheap for batch jobs and workers that never draw a chart.
+    """
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if attr.startswith("__"):
+            raise AttributeError(attr)
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__["_module"] = module
+        return getattr(module, attr)
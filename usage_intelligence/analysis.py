@@ -5,9 +5,12 @@ from __future__ import annotations
 from datetime import timedelta
 from typing import Iterable
 
+import numpy as np
 import pandas as pd
 
 FLAG_COLUMNS = ["RAPID", "LOC_CONFLICT", "DEVICE_HOP"]
+# Bit positions used by the packed ``Flags`` column of low-memory results.
+FLAG_BITS = {"RAPID": 1, "LOC_CONFLICT": 2, "DEVICE_HOP": 4}
 
 
 def parse_timestamps(df: pd.DataFrame) -> pd.DataFrame:
@@ -58,14 +61,129 @@ def _flag_device_hop(df: pd.DataFrame, threshold: int, window: int) -> pd.Series
     return flags
 
 
+def _flag_bitmask(df: pd.DataFrame, rapid_th: int, hop_threshold: int, window: int) -> np.ndarray:
+    """Packed ``FLAG_BITS`` per row, computed through a sort permutation.
+
+    Rows are never reordered or copied: the operator/timestamp sort order
+    is held as an index array and each rule works on small integer arrays
+    (timestamps, factorised operator/location/device codes) taken through
+    it. Semantics match ``_flag_rapid``, ``_flag_loc_conflict`` and
+    ``_flag_device_hop``.
+    """
+    n = len(df)
+    bits = np.zeros(n, dtype=np.uint8)
+    if n == 0:
+        return bits
+    # int32 codes/positions halve the footprint of every temporary below.
+    pos = np.int32 if n < 2**31 else np.int64
+    ops = pd.factorize(df["Operator_ID"])[0].astype(np.int32)
+    times = df["Timestamp"].to_numpy("datetime64[ns]").view(np.int64)
+    order = np.lexsort((times, ops)).astype(pos)
+    ops = ops[order]
+    times = times[order]
+    window_ns = window * 60 * 10**9
+
+    # Previous event of the same operator (NaN operators are never flagged).
+    same = np.zeros(n, dtype=bool)
+    same[1:] = (ops[1:] == ops[:-1]) & (ops[1:] >= 0)
+    delta = np.zeros(n, dtype=np.int64)
+    delta[1:] = np.diff(times)
+    bits[same & (delta < rapid_th * 10**9)] |= FLAG_BITS["RAPID"]
+
+    locs = pd.factorize(df["Location"])[0].astype(np.int32)[order]
+    prev_locs = np.full(n, -1, dtype=np.int32)
+    prev_locs[1:] = locs[:-1]
+    same &= (prev_locs >= 0) & (prev_locs != locs) & (delta <= window_ns)
+    bits[same] |= FLAG_BITS["LOC_CONFLICT"]
+    del same, delta, locs, prev_locs
+
+    # Device hopping: distinct devices per operator within +/- window.
+    starts = np.flatnonzero(np.r_[True, ops[1:] != ops[:-1]])
+    ends = np.r_[starts[1:], n]
+    lo = np.arange(n, dtype=pos)
+    span = np.zeros(n, dtype=pos)
+    for s, e in zip(starts, ends):
+        if ops[s] < 0:
+            continue
+        seg = times[s:e]
+        lo[s:e] = s + np.searchsorted(seg, seg - window_ns, side="left")
+        span[s:e] = s + np.searchsorted(seg, seg + window_ns, side="right") - lo[s:e]
+    del times
+    # A device counts once per window: at its first occurrence, i.e. where
+    # its previous event (same operator) lies before the window start.
+    devices = pd.factorize(df["Device_ID"])[0].astype(np.int32)[order]
+    by_device = np.lexsort((devices, ops)).astype(pos)
+    prev_same = np.full(n, -1, dtype=pos)
+    repeat = (ops[by_device[1:]] == ops[by_device[:-1]]) & (
+        devices[by_device[1:]] == devices[by_device[:-1]]
+    )
+    prev_same[by_device[1:][repeat]] = by_device[:-1][repeat]
+    prev_same[devices < 0] = n
+    del by_device, repeat, devices, ops
+    distinct = np.zeros(n, dtype=np.int32)
+    for k in range(int(span.max())):
+        rows = np.flatnonzero(span > k)
+        distinct[rows] += prev_same[lo[rows] + k] < lo[rows]
+    bits[distinct >= hop_threshold] |= FLAG_BITS["DEVICE_HOP"]
+    del distinct, prev_same, lo, span
+
+    mask = np.empty(n, dtype=np.uint8)
+    mask[order] = bits
+    return mask
+
+
+def flag_view(df: pd.DataFrame, name: str) -> pd.Series:
+    """Boolean flag column ``name`` (or ``Flagged``) for either result layout.
+
+    Frames from the default mode carry materialised bool columns; frames
+    from low-memory mode carry a single packed ``Flags`` column and the
+    requested view is derived from it on access.
+    """
+    if name in df.columns:
+        return df[name]
+    if name == "Flagged":
+        return (df["Flags"] != 0).rename(name)
+    return ((df["Flags"] & FLAG_BITS[name]) != 0).rename(name)
+
+
+def flag_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """``Flagged`` plus the ``FLAG_COLUMNS`` as a bool frame."""
+    return pd.DataFrame({c: flag_view(df, c) for c in ["Flagged", *FLAG_COLUMNS]})
+
+
+def pack_flags(df: pd.DataFrame) -> np.ndarray:
+    """uint8 ``FLAG_BITS`` mask for either result layout."""
+    if "Flags" in df.columns:
+        return df["Flags"].to_numpy(np.uint8)
+    mask = np.zeros(len(df), dtype=np.uint8)
+    for name, bit in FLAG_BITS.items():
+        mask[df[name].to_numpy(bool)] |= bit
+    return mask
+
+
 def compute_all_flags(
     df: pd.DataFrame,
     *,
     rapid_th: int = 60,
     hop_threshold: int = 3,
     window_minutes: int = 5,
+    low_memory: bool = False,
 ) -> pd.DataFrame:
-    """Compute all misuse flags and return the annotated dataframe."""
+    """Compute all misuse flags and return the annotated dataframe.
+
+    By default the input is copied, sorted by timestamp and annotated with
+    bool ``RAPID``, ``LOC_CONFLICT``, ``DEVICE_HOP`` and ``Flagged``
+    columns. With ``low_memory=True`` no copy or sorted frame is made:
+    the input is annotated in place with a single uint8 ``Flags`` bitmask
+    (see ``FLAG_BITS``) and returned in its original row order; use
+    :func:`flag_view` or :func:`flag_frame` to read individual flags.
+    """
+    if low_memory:
+        if "Event_ID" not in df.columns or df["Event_ID"].duplicated().any():
+            df["Event_ID"] = np.arange(1, len(df) + 1)
+        df["Flags"] = _flag_bitmask(df, rapid_th, hop_threshold, window_minutes)
+        return df
+
     data = df.copy()
     data = ensure_unique_event_id(data)
     data = data.sort_values("Timestamp")
@@ -79,11 +197,11 @@ def compute_all_flags(
 
 def compute_scores(df: pd.DataFrame) -> pd.DataFrame:
     """Aggregate a suspicion score for each operator."""
-    grouped = df.groupby("Operator_ID").agg(
-        Flagged_Count=("Flagged", "sum"),
-        RAPID=("RAPID", "sum"),
-        LOC_CONFLICT=("LOC_CONFLICT", "sum"),
-        DEVICE_HOP=("DEVICE_HOP", "sum"),
+    grouped = (
+        flag_frame(df)
+        .groupby(df["Operator_ID"])
+        .sum()
+        .rename(columns={"Flagged": "Flagged_Count"})
     )
     grouped["Suspicion_Score"] = (
         grouped["Flagged_Count"] * 2
@@ -0,0 +1,342 @@
+from __future__ import annotations
+
+"""Per-operator behavioural baselines trained incrementally.
+
+``distributions_and_outliers`` only compares global event counts against a
+mean + 2 sigma cutoff. :class:`OperatorBaseline` instead learns, for each
+operator, what normal looks like:
+
+* an hour-of-week activity profile (168 counters);
+* how often each device and location is used;
+* the distribution of log inter-event intervals, as running Welford
+  mean/variance plus a fixed-bin streaming histogram.
+
+All state is held in dense numpy arrays indexed by operator, device and
+location codes, so :meth:`OperatorBaseline.update` costs O(batch) (plus
+amortised array growth when new keys appear) and
+:meth:`OperatorBaseline.score` is fully vectorised.
+"""
+
+import json
+from pathlib import Path
+from typing import BinaryIO, Dict, Hashable, Iterable
+
+import numpy as np
+import pandas as pd
+
+HOURS_PER_WEEK = 168
+# Histogram of log10(interval seconds + 1): 0 (same second) to 7 (~4 months).
+INTERVAL_BINS = np.linspace(0.0, 7.0, 29)
+
+
+class _KeyIndex:
+    """Stable mapping from keys to dense integer codes.
+
+    Keys are held as strings, as in the history store, so an ID read as
+    ``123`` from one file and ``"123"`` from another is the same key.
+    """
+
+    def __init__(self, keys: Iterable[Hashable] = ()):
+        self.codes: Dict[str, int] = {}
+        for key in keys:
+            self.codes.setdefault(str(key), len(self.codes))
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def encode(self, values: pd.Series, add: bool) -> np.ndarray:
+        """Codes for ``values``; unknown or missing keys map to -1 unless added."""
+        inverse, uniques = pd.factorize(values.astype("string"))
+        if add:
+            ids = [self.codes.setdefault(key, len(self.codes)) for key in uniques]
+        else:
+            ids = [self.codes.get(key, -1) for key in uniques]
+        ids = np.append(np.asarray(ids, dtype=np.int64), -1)
+        # factorize marks missing values -1, which picks the trailing -1.
+        return ids[inverse]
+
+
+def _grow(array: np.ndarray, rows: int, cols: int | None = None) -> np.ndarray:
+    """Return ``array`` with capacity for ``rows`` (and ``cols``), doubling."""
+    shape = list(array.shape)
+    need_rows = rows > shape[0]
+    need_cols = cols is not None and cols > shape[1]
+    if not (need_rows or need_cols):
+        return array
+    if need_rows:
+        shape[0] = max(rows, 2 * shape[0], 8)
+    if need_cols:
+        shape[1] = max(cols, 2 * shape[1], 8)
+    grown = np.zeros(shape, dtype=array.dtype)
+    grown[tuple(slice(0, n) for n in array.shape)] = array
+    return grown
+
+
+class OperatorBaseline:
+    """Running behavioural statistics per operator.
+
+    Parameters
+    ----------
+    min_events:
+        Operators with fewer events in the baseline are not scored.
+    hour_ratio:
+        An event is unusual in time when its hour-of-week's share of the
+        operator's activity is below this fraction of their typical hour
+        share. The typical share is the share of the hour an average event
+        of theirs falls in (``sum(p**2)`` over the profile): ``1/168`` for
+        an operator active evenly all week, ``1/45`` for one working 45
+        weekday hours. Comparing against it rather than a fixed share keeps
+        the threshold meaningful both for short histories and for
+        operators with narrow shift patterns.
+    key_share:
+        A device or location is unusual for an operator when it accounts
+        for less than this share of their events.
+    interval_z:
+        Absolute z-score of the log interval beyond which an inter-event
+        gap is unusual.
+    """
+
+    def __init__(
+        self,
+        *,
+        min_events: int = 20,
+        hour_ratio: float = 0.25,
+        key_share: float = 0.02,
+        interval_z: float = 3.0,
+    ):
+        self.min_events = min_events
+        self.hour_ratio = hour_ratio
+        self.key_share = key_share
+        self.interval_z = interval_z
+        self.operators = _KeyIndex()
+        self.devices = _KeyIndex()
+        self.locations = _KeyIndex()
+        # Arrays are over-allocated (see ``_grow``); rows beyond
+        # ``len(self.operators)`` are unused zeros.
+        self.hour_counts = np.zeros((8, HOURS_PER_WEEK), dtype=np.int64)
+        self.device_counts = np.zeros((8, 8), dtype=np.int64)
+        self.location_counts = np.zeros((8, 8), dtype=np.int64)
+        self.events = np.zeros(8, dtype=np.int64)
+        self.last_seen = np.zeros(8, dtype=np.int64)
+        # Welford state of log10(interval seconds + 1) per operator.
+        self.interval_n = np.zeros(8, dtype=np.int64)
+        self.interval_mean = np.zeros(8, dtype=np.float64)
+        self.interval_m2 = np.zeros(8, dtype=np.float64)
+        self.interval_hist = np.zeros((8, len(INTERVAL_BINS) - 1), dtype=np.int64)
+
+    def _reserve(self) -> None:
+        n_ops = len(self.operators)
+        self.hour_counts = _grow(self.hour_counts, n_ops)
+        self.device_counts = _grow(self.device_counts, n_ops, len(self.devices))
+        self.location_counts = _grow(self.location_counts, n_ops, len(self.locations))
+        self.interval_hist = _grow(self.interval_hist, n_ops)
+        for name in ("events", "last_seen", "interval_n", "interval_mean", "interval_m2"):
+            setattr(self, name, _grow(getattr(self, name), n_ops))
+
+    @staticmethod
+    def _intervals(ops: np.ndarray, times: np.ndarray, order: np.ndarray):
+        """Log intervals between consecutive events of the same operator."""
+        ops_sorted = ops[order]
+        times_sorted = times[order]
+        same = ops_sorted[1:] == ops_sorted[:-1]
+        gaps = np.diff(times_sorted) / 1e9
+        log_gaps = np.full(len(order), np.nan)
+        log_gaps[1:][same] = np.log10(gaps[same] + 1.0)
+        return ops_sorted, times_sorted, log_gaps
+
+    def update(self, df: pd.DataFrame) -> "OperatorBaseline":
+        """Fold a batch of events into the baseline in O(batch).
+
+        Intervals bridging the previous batch are included when the batch
+        starts after the operator's last seen event; out-of-order batches
+        still update every other statistic.
+        """
+        data = df[df["Operator_ID"].notna()]
+        if data.empty:
+            return self
+        ops = self.operators.encode(data["Operator_ID"], add=True)
+        self.devices.encode(data["Device_ID"], add=True)
+        self.locations.encode(data["Location"], add=True)
+        self._reserve()
+        devices = self.devices.encode(data["Device_ID"], add=False)
+        locations = self.locations.encode(data["Location"], add=False)
+        stamps = pd.DatetimeIndex(data["Timestamp"])
+        times = stamps.as_unit("ns").asi8
+        how = (stamps.dayofweek * 24 + stamps.hour).to_numpy()
+
+        np.add.at(self.events, ops, 1)
+        np.add.at(self.hour_counts, (ops, how), 1)
+        known = devices >= 0
+        np.add.at(self.device_counts, (ops[known], devices[known]), 1)
+        known = locations >= 0
+        np.add.at(self.location_counts, (ops[known], locations[known]), 1)
+
+        order = np.lexsort((times, ops))
+        ops_sorted, times_sorted, log_gaps = self._intervals(ops, times, order)
+        first = np.r_[True, ops_sorted[1:] != ops_sorted[:-1]]
+        prev = self.last_seen[ops_sorted[first]]
+        bridge = (prev > 0) & (times_sorted[first] >= prev)
+        gaps = (times_sorted[first] - prev) / 1e9
+        log_gaps[np.flatnonzero(first)[bridge]] = np.log10(gaps[bridge] + 1.0)
+        np.maximum.at(self.last_seen, ops_sorted, times_sorted)
+
+        valid = ~np.isnan(log_gaps)
+        self._update_intervals(ops_sorted[valid], log_gaps[valid])
+        return self
+
+    def _update_intervals(self, ops: np.ndarray, values: np.ndarray) -> None:
+        """Merge batch moments into the Welford state (Chan et al.)."""
+        size = len(self.interval_n)
+        n_b = np.bincount(ops, minlength=size)
+        touched = n_b > 0
+        sum_b = np.bincount(ops, weights=values, minlength=size)
+        mean_b = np.divide(sum_b, n_b, out=np.zeros(size), where=touched)
+        m2_b = np.bincount(ops, weights=(values - mean_b[ops]) ** 2, minlength=size)
+        n_a = self.interval_n
+        n = n_a + n_b
+        delta = mean_b - self.interval_mean
+        safe_n = np.maximum(n, 1)
+        self.interval_mean = np.where(touched, self.interval_mean + delta * n_b / safe_n, self.interval_mean)
+        self.interval_m2 = self.interval_m2 + m2_b + np.where(touched, delta**2 * n_a * n_b / safe_n, 0.0)
+        self.interval_n = n
+        bins = np.clip(np.searchsorted(INTERVAL_BINS, values, side="right") - 1, 0, len(INTERVAL_BINS) - 2)
+        np.add.at(self.interval_hist, (ops, bins), 1)
+
+    def interval_std(self) -> np.ndarray:
+        """Standard deviation of log10 intervals per operator code."""
+        n = self.interval_n
+        return np.sqrt(np.divide(self.interval_m2, n - 1, out=np.full(len(n), np.nan), where=n > 1))
+
+    def score(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Score events against the baseline, aligned to ``df.index``.
+
+        Returns ``Hour_Share``, ``Device_Share``, ``Location_Share`` (the
+        share of the operator's history matching the event), ``Interval_Z``
+        and bool ``Unusual_*`` indicators, plus ``Baseline_Score`` as the
+        number of indicators raised (0-4). Operators unknown to the
+        baseline or with fewer than ``min_events`` events score 0.
+        """
+        ops = self.operators.encode(df["Operator_ID"], add=False)
+        devices = self.devices.encode(df["Device_ID"], add=False)
+        locations = self.locations.encode(df["Location"], add=False)
+        stamps = pd.DatetimeIndex(df["Timestamp"])
+        times = stamps.as_unit("ns").asi8
+        how = (stamps.dayofweek * 24 + stamps.hour).to_numpy()
+
+        known = ops >= 0
+        safe_ops = np.where(known, ops, 0)
+        events = np.where(known, self.events[safe_ops], 0)
+        trained = known & (events >= self.min_events)
+        totals = np.maximum(events, 1)
+
+        # Share of the operator's week spent in this hour, smoothed with a
+        # single pseudo-event spread evenly over the week so unseen hours
+        # are small but non-zero.
+        hour_share = np.where(
+            known,
+            (self.hour_counts[safe_ops, how] + 1 / HOURS_PER_WEEK) / (events + 1),
+            np.nan,
+        )
+        n_ops = len(self.operators)
+        typical = (self.hour_counts[:n_ops].astype(np.float64) ** 2).sum(axis=1)
+        typical /= np.maximum(self.events[:n_ops], 1) ** 2
+        typical_share = np.where(known, typical[safe_ops] if n_ops else 0.0, np.nan)
+
+        def key_share(counts: np.ndarray, keys: np.ndarray) -> np.ndarray:
+            hits = np.zeros(len(keys))
+            ok = known & (keys >= 0)
+            hits[ok] = counts[safe_ops[ok], keys[ok]]
+            return np.where(known, hits / totals, np.nan)
+
+        device_share = key_share(self.device_counts, devices)
+        location_share = key_share(self.location_counts, locations)
+
+        order = np.lexsort((times, ops))
+        ops_sorted, _, log_gaps = self._intervals(ops, times, order)
+        log_gaps[ops_sorted < 0] = np.nan
+        std = self.interval_std()
+        safe = np.where(ops_sorted >= 0, ops_sorted, 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            z_sorted = (log_gaps - self.interval_mean[safe]) / std[safe]
+        interval_z = np.empty(len(df))
+        interval_z[order] = z_sorted
+
+        result = pd.DataFrame(
+            {
+                "Hour_Share": hour_share,
+                "Device_Share": device_share,
+                "Location_Share": location_share,
+                "Interval_Z": interval_z,
+            },
+            index=df.index,
+        )
+        result["Unusual_Hour"] = trained & (hour_share < self.hour_ratio * typical_share)
+        result["Unusual_Device"] = trained & (device_share < self.key_share)
+        result["Unusual_Location"] = trained & (location_share < self.key_share)
+        result["Unusual_Interval"] = trained & (np.abs(np.nan_to_num(interval_z)) > self.interval_z)
+        result["Baseline_Score"] = result[
+            ["Unusual_Hour", "Unusual_Device", "Unusual_Location", "Unusual_Interval"]
+        ].sum(axis=1)
+        return result
+
+    def profile(self, operator: Hashable) -> pd.DataFrame:
+        """Hour-of-week activity counts for ``operator`` (7 days x 24 hours)."""
+        code = self.operators.codes[str(operator)]
+        days = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+        return pd.DataFrame(self.hour_counts[code].reshape(7, 24), index=days)
+
+    def save(self, path: str | Path | BinaryIO) -> None:
+        """Persist the baseline as a compressed ``.npz`` archive.
+
+        ``path`` may also be an open binary file, e.g. a temporary file
+        that is renamed into place once written.
+        """
+        n_ops = len(self.operators)
+        keys = {
+            "operators": list(self.operators.codes),
+            "devices": list(self.devices.codes),
+            "locations": list(self.locations.codes),
+            "params": [self.min_events, self.hour_ratio, self.key_share, self.interval_z],
+        }
+        np.savez_compressed(
+            path,
+            keys=np.array(json.dumps(keys)),
+            hour_counts=self.hour_counts[:n_ops],
+            device_counts=self.device_counts[:n_ops, : len(self.devices)],
+            location_counts=self.location_counts[:n_ops, : len(self.locations)],
+            events=self.events[:n_ops],
+            last_seen=self.last_seen[:n_ops],
+            interval_n=self.interval_n[:n_ops],
+            interval_mean=self.interval_mean[:n_ops],
+            interval_m2=self.interval_m2[:n_ops],
+            interval_hist=self.interval_hist[:n_ops],
+        )
+
+    @classmethod
+    def load(cls, path: str | Path) -> "OperatorBaseline":
+        """Restore a baseline written by :meth:`save`."""
+        with np.load(path) as archive:
+            keys = json.loads(str(archive["keys"]))
+            min_events, hour_ratio, key_share, interval_z = keys["params"]
+            baseline = cls(
+                min_events=int(min_events),
+                hour_ratio=hour_ratio,
+                key_share=key_share,
+                interval_z=interval_z,
+            )
+            baseline.operators = _KeyIndex(keys["operators"])
+            baseline.devices = _KeyIndex(keys["devices"])
+            baseline.locations = _KeyIndex(keys["locations"])
+            for name in (
+                "hour_counts",
+                "device_counts",
+                "location_counts",
+                "events",
+                "last_seen",
+                "interval_n",
+                "interval_mean",
+                "interval_m2",
+                "interval_hist",
+            ):
+                setattr(baseline, name, archive[name])
+        return baseline
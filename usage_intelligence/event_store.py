@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+"""Time-indexed, in-memory event store used by filters and drilldowns."""
+
+from typing import Dict, Hashable, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+INDEX_COLUMNS = ["Operator_ID", "Device_ID", "Barcode", "Location", "Test_Type"]
+
+
+class EventStore:
+    """Events sorted by ``Timestamp`` with per-key position indexes.
+
+    The frame is sorted once on construction. Date ranges are resolved by
+    binary search over the timestamp column and returned as contiguous
+    slices of the sorted frame, so no boolean mask is built. For each of
+    the indexed columns the store keeps, per key, the ascending row
+    positions of that key's events; because positions follow the sort
+    order they are also in time order and can be range-bounded with a
+    binary search. Lookups therefore cost O(log n + k) for k matches.
+
+    Only :meth:`between` returns a zero-copy slice. Key lookups
+    (:meth:`lookup`, :meth:`select` with key filters) gather the k
+    matching rows, which copies them; callers that only need the rows'
+    locations can use :meth:`positions` and slice the frame themselves.
+    """
+
+    def __init__(self, df: pd.DataFrame, index_columns: Iterable[str] = INDEX_COLUMNS):
+        if df["Timestamp"].is_monotonic_increasing:
+            frame = df
+        else:
+            frame = df.sort_values("Timestamp", kind="stable")
+        self.frame = frame
+        self._times = pd.DatetimeIndex(frame["Timestamp"])
+        self._indexes: Dict[str, Dict[Hashable, np.ndarray]] = {
+            column: self._build_index(frame[column])
+            for column in index_columns
+            if column in frame.columns
+        }
+
+    @staticmethod
+    def _build_index(values: pd.Series) -> Dict[Hashable, np.ndarray]:
+        codes, uniques = pd.factorize(values, sort=True)
+        order = np.argsort(codes, kind="stable")
+        # Missing values are coded -1 and sort first; skip past them.
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(codes[codes >= 0], minlength=len(uniques)))))
+        bounds += int((codes < 0).sum())
+        return {
+            key: order[bounds[i]:bounds[i + 1]]
+            for i, key in enumerate(uniques)
+        }
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    @property
+    def start(self) -> pd.Timestamp | None:
+        """Earliest timestamp in the store."""
+        return self._times[0] if len(self._times) else None
+
+    @property
+    def end(self) -> pd.Timestamp | None:
+        """Latest timestamp in the store."""
+        return self._times[-1] if len(self._times) else None
+
+    def keys(self, column: str) -> List[Hashable]:
+        """Sorted distinct non-null values of an indexed column."""
+        return list(self._indexes[column])
+
+    def _timestamp(self, value) -> pd.Timestamp:
+        """``value`` as a timestamp comparable with the stored index.
+
+        Naive bounds (e.g. the sidebar's ``datetime.date`` values) are
+        taken to be in the events' timezone when the timestamps carry one.
+        """
+        ts = pd.Timestamp(value)
+        if self._times.tz is not None and ts.tz is None:
+            ts = ts.tz_localize(self._times.tz)
+        return ts
+
+    def _bounds(self, start, end) -> tuple[int, int]:
+        """Positional bounds of the half-open interval ``[start, end)``."""
+        lo = 0 if start is None else self._times.searchsorted(self._timestamp(start), side="left")
+        hi = len(self._times) if end is None else self._times.searchsorted(self._timestamp(end), side="left")
+        return int(lo), int(max(lo, hi))
+
+    def positions(self, column: str, keys: Iterable[Hashable], start=None, end=None) -> np.ndarray:
+        """Sorted row positions matching any of ``keys`` within ``[start, end)``."""
+        index = self._indexes[column]
+        lo, hi = self._bounds(start, end)
+        parts = []
+        for key in keys:
+            pos = index.get(key)
+            if pos is None:
+                continue
+            parts.append(pos[pos.searchsorted(lo):pos.searchsorted(hi)])
+        if not parts:
+            return np.empty(0, dtype=np.intp)
+        if len(parts) == 1:
+            return parts[0]
+        return np.sort(np.concatenate(parts))
+
+    def between(self, start=None, end=None) -> pd.DataFrame:
+        """Events with ``start <= Timestamp < end`` as a slice of the frame."""
+        lo, hi = self._bounds(start, end)
+        return self.frame.iloc[lo:hi]
+
+    def lookup(self, column: str, key: Hashable, start=None, end=None) -> pd.DataFrame:
+        """Events for a single key of an indexed column, in time order.
+
+        The k matching rows are gathered into a new frame (a copy).
+        """
+        return self.frame.take(self.positions(column, [key], start, end))
+
+    def select(self, start=None, end=None, **filters: Iterable[Hashable] | None) -> pd.DataFrame:
+        """Events within ``[start, end)`` matching every non-empty key filter.
+
+        Keyword arguments map column names to the accepted keys, e.g.
+        ``select(Operator_ID=["OP1"], Device_ID=["D1", "D2"])``. Indexed
+        columns are resolved from their position lists; any other column
+        falls back to an ``isin`` over the already-narrowed rows. With no
+        key filters the result is a zero-copy slice; otherwise the matching
+        rows are gathered into a copy.
+        """
+        active = {column: list(keys) for column, keys in filters.items() if keys}
+        indexed = [c for c in active if c in self._indexes]
+        if not indexed:
+            data = self.between(start, end)
+        else:
+            pos = None
+            for column in indexed:
+                found = self.positions(column, active[column], start, end)
+                pos = found if pos is None else np.intersect1d(pos, found, assume_unique=True)
+            data = self.frame.take(pos)
+        for column in active:
+            if column not in self._indexes:
+                data = data[data[column].isin(active[column])]
+        return data
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+"""Date-partitioned Parquet store of flagged events and daily rollups.
+
+Each upload is analysed in isolation, so looking at trends across months
+would otherwise mean re-uploading every historic log. ``HistoryStore``
+persists the output of :func:`~usage_intelligence.analysis.compute_all_flags`
+together with per-operator daily score rollups::
+
+    <root>/manifest.json
+    <root>/events/date=YYYY-MM-DD/part.parquet
+    <root>/rollups/date=YYYY-MM-DD/part.parquet
+
+Events are stored with flags packed into a single uint8 ``Flags`` column
+(see :data:`~usage_intelligence.analysis.FLAG_BITS`).
+The manifest records, per table and day, the partition file, its row count
+and the operators it contains. Queries consult the manifest to skip days
+outside the requested range and days without any requested operator, then
+push the operator filter and column selection down to the Parquet reader.
+Appending an upload only rewrites the day partitions it touches.
+"""
+
+import json
+import os
+from datetime import date
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import pandas as pd
+
+from usage_intelligence.analysis import FLAG_COLUMNS, compute_scores, pack_flags
+
+TABLES = ("events", "rollups")
+IDENTITY_COLUMNS = ["Timestamp", "Operator_ID", "Device_ID", "Location", "Test_Type", "Barcode"]
+MANIFEST_VERSION = 1
+# Temporary column used while de-duplicating (see ``_with_occurrence``).
+OCCURRENCE = "_Occurrence"
+
+
+def daily_rollups(df: pd.DataFrame) -> pd.DataFrame:
+    """Per-operator, per-day event counts, flag counts and suspicion score."""
+    frames = []
+    for day, part in df.groupby(df["Timestamp"].dt.normalize(), sort=True):
+        scores = compute_scores(part)
+        counts = part.groupby("Operator_ID").size().rename("Event_Count")
+        scores = scores.join(counts, on="Operator_ID")
+        scores.insert(0, "Date", day)
+        frames.append(scores)
+    if not frames:
+        return pd.DataFrame(
+            columns=["Date", "Operator_ID", "Flagged_Count", *FLAG_COLUMNS, "Suspicion_Score", "Risk_Level", "Event_Count"]
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def _packed(df: pd.DataFrame) -> pd.DataFrame:
+    """``df`` with bool flag columns replaced by the packed ``Flags`` mask."""
+    flags = pack_flags(df)
+    return df.drop(columns=["Flagged", *FLAG_COLUMNS], errors="ignore").assign(Flags=flags)
+
+
+def _normalised(df: pd.DataFrame) -> pd.DataFrame:
+    """``df`` with identity columns as strings so uploads merge cleanly.
+
+    IDs may be read as integers from one file and as text from another
+    (e.g. numeric vs alphanumeric barcodes); mixing both in one partition
+    would make Parquet reject the column.
+    """
+    casts = {c: "string" for c in IDENTITY_COLUMNS if c in df.columns and c != "Timestamp"}
+    return df.astype(casts)
+
+
+def _with_occurrence(df: pd.DataFrame) -> pd.DataFrame:
+    """``df`` with the ordinal of each row among rows of identical identity.
+
+    Logs often carry minute-resolution timestamps and no barcode, so
+    genuine repeat tests (the rapid-succession cases) can share every
+    identity column. Keying de-duplication on the ordinal as well keeps
+    N identical rows as N, while re-saving the same upload still
+    replaces them one for one.
+    """
+    identity = [c for c in IDENTITY_COLUMNS if c in df.columns]
+    return df.assign(**{OCCURRENCE: df.groupby(identity, dropna=False, sort=False).cumcount()})
+
+
+def _stage(path: Path, write) -> Path:
+    """Write to a temporary sibling of ``path`` and return it."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        write(tmp)
+    except Exception:
+        tmp.unlink(missing_ok=True)
+        raise
+    return tmp
+
+
+def _write_atomic(path: Path, write) -> None:
+    """Write via a temporary sibling so readers never see a partial file."""
+    os.replace(_stage(path, write), path)
+
+
+class HistoryStore:
+    """Persistent, date-partitioned history of flagged events."""
+
+    def __init__(self, root: str | os.PathLike):
+        self.root = Path(root)
+        self.manifest_path = self.root / "manifest.json"
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict:
+        if self.manifest_path.is_file():
+            manifest = json.loads(self.manifest_path.read_text())
+            if manifest.get("version") != MANIFEST_VERSION:
+                raise ValueError(f"Unsupported history manifest version: {manifest.get('version')}")
+            return manifest
+        return {"version": MANIFEST_VERSION, "tables": {table: {} for table in TABLES}}
+
+    def _save_manifest(self) -> None:
+        _write_atomic(
+            self.manifest_path,
+            lambda tmp: tmp.write_text(json.dumps(self.manifest, indent=1, sort_keys=True)),
+        )
+
+    def days(self, table: str = "events") -> List[date]:
+        """Sorted list of days stored for ``table``."""
+        return [date.fromisoformat(d) for d in sorted(self.manifest["tables"][table])]
+
+    def _partition_path(self, table: str, day: str) -> Path:
+        return self.root / table / f"date={day}" / "part.parquet"
+
+    def _partition_entry(self, path: Path, data: pd.DataFrame) -> Dict:
+        return {
+            "path": str(path.relative_to(self.root)),
+            "rows": len(data),
+            "operators": sorted(map(str, data["Operator_ID"].dropna().unique())),
+        }
+
+    def _merge_day(self, key: str, part: pd.DataFrame) -> pd.DataFrame:
+        """Stored events of day ``key`` merged with ``part``, de-duplicated."""
+        part = _with_occurrence(_normalised(_packed(part)))
+        if key in self.manifest["tables"]["events"]:
+            existing = _normalised(_packed(pd.read_parquet(self._partition_path("events", key))))
+            existing = _with_occurrence(existing)
+            for column in part.columns.intersection(existing.columns):
+                if part[column].dtype != existing[column].dtype:
+                    part[column] = part[column].astype("string")
+                    existing[column] = existing[column].astype("string")
+            part = pd.concat([existing, part], ignore_index=True)
+        identity = [c for c in IDENTITY_COLUMNS if c in part.columns]
+        part = part.drop_duplicates(subset=[*identity, OCCURRENCE], keep="last").drop(columns=OCCURRENCE)
+        return part.sort_values("Timestamp", kind="stable").reset_index(drop=True)
+
+    def append(self, flagged: pd.DataFrame) -> List[str]:
+        """Merge ``flagged`` events into the store and return touched days.
+
+        Events are matched on timestamp, operator, device, location, test
+        type, barcode and their occurrence among identical rows (see
+        ``_with_occurrence``) against events already stored for the day;
+        the newest copy wins, so saving the same log twice leaves history
+        unchanged while repeat tests within a log are all kept. Only the touched day
+        partitions and their rollups are rewritten.
+
+        All partitions are first written to temporary files; they replace
+        the live files, and the manifest is updated, only once every write
+        has succeeded. On error nothing is changed and the error is raised.
+        """
+        staged = []
+        try:
+            for day, part in flagged.groupby(flagged["Timestamp"].dt.normalize(), sort=True):
+                key = day.date().isoformat()
+                events = self._merge_day(key, part)
+                for table, data in (("events", events), ("rollups", daily_rollups(events))):
+                    path = self._partition_path(table, key)
+                    tmp = _stage(path, lambda tmp: data.to_parquet(tmp, index=False))
+                    staged.append((table, key, path, tmp, self._partition_entry(path, data)))
+        except Exception:
+            for *_, tmp, _ in staged:
+                tmp.unlink(missing_ok=True)
+            raise
+        for table, key, path, tmp, entry in staged:
+            os.replace(tmp, path)
+            self.manifest["tables"][table][key] = entry
+        touched = sorted({key for _, key, *_ in staged})
+        if touched:
+            self._save_manifest()
+        return touched
+
+    def _select(self, table: str, start, end, operators) -> List[Path]:
+        """Partition files surviving date and operator pruning."""
+        start = None if start is None else pd.Timestamp(start).date().isoformat()
+        end = None if end is None else pd.Timestamp(end).date().isoformat()
+        wanted = None if operators is None else set(map(str, operators))
+        paths = []
+        for day, entry in sorted(self.manifest["tables"][table].items()):
+            if (start and day < start) or (end and day > end):
+                continue
+            if wanted is not None and wanted.isdisjoint(entry["operators"]):
+                continue
+            paths.append(self.root / entry["path"])
+        return paths
+
+    def _read(self, table: str, start, end, operators, columns) -> pd.DataFrame:
+        # Identity columns are stored as strings (see ``_normalised``).
+        operators = None if operators is None else [str(op) for op in operators]
+        paths = self._select(table, start, end, operators)
+        filters = None if operators is None else [("Operator_ID", "in", operators)]
+        frames = [pd.read_parquet(p, columns=columns, filters=filters) for p in paths]
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)
+
+    def load_events(
+        self,
+        start=None,
+        end=None,
+        *,
+        operators: Iterable[str] | None = None,
+        columns: List[str] | None = None,
+    ) -> pd.DataFrame:
+        """Stored flagged events for days ``start`` to ``end`` inclusive."""
+        return self._read("events", start, end, operators, columns)
+
+    def load_rollups(
+        self,
+        start=None,
+        end=None,
+        *,
+        operators: Iterable[str] | None = None,
+        columns: List[str] | None = None,
+    ) -> pd.DataFrame:
+        """Per-operator daily rollups for days ``start`` to ``end`` inclusive."""
+        return self._read("rollups", start, end, operators, columns)
@@ -0,0 +1,344 @@
+from __future__ import annotations
+
+"""Mergeable per-day sketches backing the dashboard's approximate mode.
+
+Exact ``nunique`` aggregates need every value in memory and must be
+recomputed from scratch for each date range. For exploring multi-year
+histories the dashboard can instead summarise each day once into small,
+fixed-size sketches and merge the days covered by a query:
+
+* :class:`HyperLogLog` estimates distinct counts with a relative standard
+  error of about ``1.04 / sqrt(2 ** precision)``.
+* :class:`GroupedHyperLogLog` holds one HyperLogLog per key, e.g. the
+  distinct operators seen on each device.
+* :class:`CountMinSketch` estimates per-key event counts. Estimates never
+  undercount and overcount by at most ``e / width`` of the total with
+  probability ``1 - exp(-depth)``.
+
+All sketches hash values with ``pandas.util.hash_pandas_object``, so
+estimates do not depend on the dtype values were read with.
+"""
+
+from datetime import date
+from typing import Dict, Iterable, Tuple
+
+import numpy as np
+import pandas as pd
+
+from usage_intelligence.analysis import flag_view
+
+DISTINCT_COLUMNS = ["Operator_ID", "Device_ID", "Barcode"]
+GROUPED_DISTINCT = [
+    ("Device_ID", "Operator_ID"),
+    ("Location", "Operator_ID"),
+    ("Location", "Device_ID"),
+]
+COUNT_COLUMNS = ["Device_ID", "Location"]
+
+
+def hash_values(values: Iterable) -> np.ndarray:
+    """Stable 64-bit hashes of ``values`` independent of their dtype."""
+    series = pd.Series(values).astype(object)
+    return pd.util.hash_pandas_object(series, index=False).to_numpy(np.uint64)
+
+
+def _leading_zeros(words: np.ndarray) -> np.ndarray:
+    """Vectorised count of leading zero bits in 64-bit words."""
+    words = words.copy()
+    zeros = np.zeros(words.shape, dtype=np.uint8)
+    for shift in (32, 16, 8, 4, 2, 1):
+        empty = (words >> np.uint64(64 - shift)) == 0
+        zeros[empty] += shift
+        words[empty] <<= np.uint64(shift)
+    zeros[words == 0] = 64
+    return zeros
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-count sketch over ``2 ** precision`` registers.
+
+    ``registers`` may carry leading axes, in which case each leading
+    position is an independent sketch and :meth:`estimate` returns an
+    array of estimates.
+    """
+
+    def __init__(self, precision: int = 12, registers: np.ndarray | None = None):
+        if not 4 <= precision <= 16:
+            raise ValueError("precision must be between 4 and 16")
+        self.precision = precision
+        self.m = 1 << precision
+        if registers is None:
+            registers = np.zeros(self.m, dtype=np.uint8)
+        self.registers = registers
+
+    @property
+    def relative_error(self) -> float:
+        """Relative standard error of the estimate."""
+        return 1.04 / np.sqrt(self.m)
+
+    def _split(self, hashes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Register index and rank for each hash."""
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        rank = np.minimum(_leading_zeros(hashes << p) + 1, 64 - self.precision + 1)
+        return index, rank.astype(np.uint8)
+
+    def estimate(self) -> float | np.ndarray:
+        """Estimated number of distinct values added."""
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.exp2(-self.registers.astype(np.float64)).sum(axis=-1)
+        empty = (self.registers == 0).sum(axis=-1)
+        # Linear counting is more accurate while many registers are unused.
+        with np.errstate(divide="ignore"):
+            linear = m * np.log(m / np.maximum(empty, 1))
+        return np.where((raw <= 2.5 * m) & (empty > 0), linear, raw)[()]
+
+
+class GroupedHyperLogLog:
+    """One :class:`HyperLogLog` of ``column`` per distinct ``by`` key."""
+
+    def __init__(self, keys: pd.Index, sketch: HyperLogLog):
+        self.keys = keys
+        self.sketch = sketch
+
+    def estimates(self) -> pd.Series:
+        """Estimated distinct ``column`` count per key."""
+        return pd.Series(np.atleast_1d(self.sketch.estimate()), index=self.keys)
+
+
+class CountMinSketch:
+    """Count-Min sketch of per-key (weighted) event counts."""
+
+    def __init__(self, width: int = 512, depth: int = 4):
+        if width & (width - 1):
+            raise ValueError("width must be a power of two")
+        self.width = width
+        self.depth = depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+        # Fixed odd multipliers give independent-enough row hashes.
+        self._multipliers = (
+            np.arange(1, 2 * depth, 2, dtype=np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+        ) | np.uint64(1)
+
+    @property
+    def epsilon(self) -> float:
+        """Overcount bound as a fraction of :attr:`total`."""
+        return float(np.e / self.width)
+
+    @property
+    def error_bound(self) -> float:
+        """Absolute overcount bound, holding with probability ``1 - exp(-depth)``."""
+        return self.epsilon * self.total
+
+    def _columns(self, hashes: np.ndarray) -> np.ndarray:
+        shift = np.uint64(64 - int(np.log2(self.width)))
+        with np.errstate(over="ignore"):
+            return ((hashes[None, :] * self._multipliers[:, None]) >> shift).astype(np.intp)
+
+    def query(self, keys: Iterable) -> np.ndarray:
+        """Estimated counts for ``keys``."""
+        keys = list(keys)
+        if not keys:
+            return np.empty(0, dtype=np.int64)
+        columns = self._columns(hash_values(keys))
+        return self.table[np.arange(self.depth)[:, None], columns].min(axis=0)
+
+
+class PartitionSketch:
+    """Sketches of a date range, as produced by :meth:`DailySketches.merged`."""
+
+    def __init__(self, precision: int = 12, group_precision: int = 10):
+        self.precision = precision
+        self.group_precision = group_precision
+        self.events = 0
+        self.distinct: Dict[str, HyperLogLog] = {}
+        self.grouped: Dict[Tuple[str, str], GroupedHyperLogLog] = {}
+        self.counts: Dict[str, CountMinSketch] = {}
+        self.flagged: Dict[str, CountMinSketch] = {}
+
+    def distinct_count(self, column: str) -> float:
+        return float(self.distinct[column].estimate())
+
+    def distinct_error(self, column: str) -> float:
+        return self.distinct[column].relative_error
+
+    def group_summary(self, by: str) -> pd.DataFrame:
+        """Approximate per-key table mirroring the exact overview tables.
+
+        Columns are ``Event_Count`` and ``Flagged_Count`` from the
+        Count-Min sketches plus ``<Column>_Count`` distinct estimates for
+        each grouped HyperLogLog keyed by ``by``.
+        """
+        frames = {
+            f"{column.split('_')[0]}_Count": sketch.estimates().round()
+            for (key, column), sketch in self.grouped.items()
+            if key == by
+        }
+        stats = pd.DataFrame(frames)
+        if by in self.counts:
+            stats.insert(0, "Event_Count", self.counts[by].query(stats.index))
+        if by in self.flagged:
+            stats.insert(1, "Flagged_Count", self.flagged[by].query(stats.index))
+        stats.index.name = by
+        return stats
+
+    def group_errors(self, by: str) -> Dict[str, float]:
+        """Error bounds for :meth:`group_summary` columns.
+
+        Count columns report the absolute overcount bound; distinct
+        columns report the relative standard error.
+        """
+        errors: Dict[str, float] = {}
+        if by in self.counts:
+            errors["Event_Count"] = self.counts[by].error_bound
+        if by in self.flagged:
+            errors["Flagged_Count"] = self.flagged[by].error_bound
+        for (key, column), sketch in self.grouped.items():
+            if key == by:
+                errors[f"{column.split('_')[0]}_Count"] = sketch.sketch.relative_error
+        return errors
+
+
+class _SparseRegisters:
+    """HyperLogLog register updates as sparse ``(day, group, index, rank)`` rows.
+
+    Only registers actually touched are stored, compacted to the maximum
+    rank per ``(day, group, index)`` and ordered by day, so a date range is
+    a contiguous slice and storage is bounded by the number of events
+    rather than ``days x groups x 2 ** precision``.
+    """
+
+    def __init__(self, day: np.ndarray, group: np.ndarray, index: np.ndarray, rank: np.ndarray):
+        order = np.lexsort((rank, index, group, day))
+        day, group, index, rank = day[order], group[order], index[order], rank[order]
+        last = np.ones(len(day), dtype=bool)
+        last[:-1] = (day[1:] != day[:-1]) | (group[1:] != group[:-1]) | (index[1:] != index[:-1])
+        self.day = day[last].astype(np.int32)
+        self.group = group[last].astype(np.int32)
+        self.index = index[last].astype(np.int16)
+        self.rank = rank[last]
+
+    def dense(self, lo: int, hi: int, n_groups: int, m: int) -> np.ndarray:
+        """Registers of days ``lo`` to ``hi - 1`` merged into ``(n_groups, m)``."""
+        a, b = np.searchsorted(self.day, [lo, hi])
+        registers = np.zeros((n_groups, m), dtype=np.uint8)
+        np.maximum.at(registers, (self.group[a:b], self.index[a:b]), self.rank[a:b])
+        return registers
+
+
+class DailySketches:
+    """Per-day sketches of a dataset, built in one vectorised pass.
+
+    Distinct-count sketches are held as :class:`_SparseRegisters` and
+    Count-Min sketches as ``(days, depth, width)`` tables, so the cost of
+    :meth:`merged` depends on the date range, not on how the dataset was
+    filtered, and memory stays proportional to the data. Group keys (e.g.
+    devices) are encoded once for the whole dataset.
+    """
+
+    def __init__(
+        self,
+        df: pd.DataFrame,
+        precision: int = 12,
+        group_precision: int = 10,
+        width: int = 256,
+        depth: int = 4,
+    ):
+        self.precision = precision
+        self.group_precision = group_precision
+        self.width = width
+        self.depth = depth
+        stamps = df["Timestamp"]
+        if stamps.dt.tz is not None:
+            stamps = stamps.dt.tz_localize(None)
+        day_values = stamps.to_numpy("datetime64[D]")
+        self.day_index = np.unique(day_values)
+        days = np.searchsorted(self.day_index, day_values)
+        n_days = len(self.day_index)
+        self.events = np.bincount(days, minlength=n_days)
+        hashes = {
+            column: hash_values(df[column])
+            for column in {c for pair in GROUPED_DISTINCT for c in pair} | set(DISTINCT_COLUMNS)
+            if column in df.columns
+        }
+        present = {column: df[column].notna().to_numpy() for column in hashes}
+
+        self.distinct: Dict[str, _SparseRegisters] = {}
+        split = HyperLogLog(precision)._split
+        for column in DISTINCT_COLUMNS:
+            if column in hashes:
+                ok = present[column]
+                index, rank = split(hashes[column][ok])
+                self.distinct[column] = _SparseRegisters(days[ok], np.zeros(ok.sum(), dtype=np.int32), index, rank)
+
+        self.keys: Dict[str, pd.Index] = {}
+        self.grouped: Dict[Tuple[str, str], _SparseRegisters] = {}
+        codes = {}
+        split = HyperLogLog(group_precision)._split
+        for by, column in GROUPED_DISTINCT:
+            if by not in hashes or column not in hashes:
+                continue
+            if by not in codes:
+                codes[by], uniques = pd.factorize(df[by])
+                self.keys[by] = pd.Index(uniques)
+            ok = present[column] & (codes[by] >= 0)
+            index, rank = split(hashes[column][ok])
+            self.grouped[(by, column)] = _SparseRegisters(days[ok], codes[by][ok], index, rank)
+
+        self.counts: Dict[str, np.ndarray] = {}
+        self.flagged: Dict[str, np.ndarray] = {}
+        has_flags = "Flagged" in df.columns or "Flags" in df.columns
+        flagged = flag_view(df, "Flagged").to_numpy(np.int64) if has_flags else None
+        for column in COUNT_COLUMNS:
+            if column not in df.columns:
+                continue
+            cells = CountMinSketch(width, depth)._columns(hash_values(df[column]))
+            cells = (days[None, :] * depth + np.arange(depth)[:, None]) * width + cells
+            self.counts[column] = self._table(cells, None, n_days)
+            if flagged is not None:
+                self.flagged[column] = self._table(cells, flagged, n_days)
+        self.flagged_total = (
+            np.bincount(days, weights=flagged, minlength=n_days).astype(np.int64)
+            if flagged is not None
+            else np.zeros(n_days, dtype=np.int64)
+        )
+
+    def _table(self, cells: np.ndarray, weights, n_days: int) -> np.ndarray:
+        size = n_days * self.depth * self.width
+        if weights is not None:
+            weights = np.tile(weights, self.depth)
+        table = np.bincount(cells.ravel(), weights=weights, minlength=size)
+        return table.astype(np.int32).reshape(n_days, self.depth, self.width)
+
+    def _day_range(self, start, end) -> Tuple[int, int]:
+        lo = 0 if start is None else np.searchsorted(self.day_index, np.datetime64(pd.Timestamp(start).date(), "D"), "left")
+        hi = len(self.day_index) if end is None else np.searchsorted(self.day_index, np.datetime64(pd.Timestamp(end).date(), "D"), "right")
+        return int(lo), int(max(lo, hi))
+
+    def merged(self, start: date | None = None, end: date | None = None) -> PartitionSketch:
+        """Merge all days between ``start`` and ``end`` inclusive."""
+        lo, hi = self._day_range(start, end)
+        total = PartitionSketch(self.precision, self.group_precision)
+        total.events = int(self.events[lo:hi].sum())
+        m = 1 << self.precision
+        for column, registers in self.distinct.items():
+            total.distinct[column] = HyperLogLog(self.precision, registers.dense(lo, hi, 1, m)[0])
+        m = 1 << self.group_precision
+        for (by, column), registers in self.grouped.items():
+            dense = registers.dense(lo, hi, len(self.keys[by]), m)
+            seen = dense.any(axis=1)
+            total.grouped[(by, column)] = GroupedHyperLogLog(
+                self.keys[by][seen], HyperLogLog(self.group_precision, dense[seen])
+            )
+        for target, tables, totals in (
+            (total.counts, self.counts, self.events),
+            (total.flagged, self.flagged, self.flagged_total),
+        ):
+            for column, table in tables.items():
+                cms = CountMinSketch(self.width, self.depth)
+                cms.table = table[lo:hi].sum(axis=0, dtype=np.int64)
+                cms.total = int(totals[lo:hi].sum())
+                target[column] = cms
+        return total
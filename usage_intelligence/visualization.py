@@ -1,7 +1,36 @@
-import streamlit as st
-import plotly.express as px
-
-def summary_cards(events):
+from usage_intelligence._lazy import LazyModule
+from usage_intelligence.analysis import FLAG_COLUMNS, flag_frame, flag_view
+from usage_intelligence.event_store import EventStore
+
+# Imported on first use so that importing this module stays cheap.
+st = LazyModule("streamlit")
+px = LazyModule("plotly.express")
+
+
+def _events_for(events, column, key=None):
+    """Events whose ``column`` equals ``key`` (all if ``None``), in time order.
+
+    An ``EventStore`` answers from its key index. A plain dataframe is
+    masked directly, which is cheaper than indexing the whole frame for a
+    single lookup.
+    """
+    if isinstance(events, EventStore):
+        return events.frame if key is None else events.lookup(column, key)
+    data = events if key is None else events[events[column] == key]
+    return data.sort_values("Timestamp", kind="stable")
+
+def summary_cards(events, sketch=None):
+    if sketch is not None:
+        # Approximate mode: totals come from merged per-day sketches.
+        st.metric("Flagged Events", sketch.events)
+        for label, column in (("Unique Barcodes Flagged", "Barcode"), ("Operators Flagged", "Operator_ID")):
+            if column in sketch.distinct:
+                st.metric(
+                    label,
+                    f"≈{sketch.distinct_count(column):,.0f}",
+                    help=f"HyperLogLog estimate, ±{sketch.distinct_error(column):.1%} standard error",
+                )
+        return
     st.metric("Flagged Events", len(events))
     st.metric("Unique Barcodes Flagged", events['Barcode'].nunique())
     st.metric("Operators Flagged", events['Operator_ID'].nunique())
@@ -19,12 +48,12 @@ def operator_heatmap(events, operator=None):
     return fig
 
 def barcode_timeline(events, barcode=None):
-    data = events if barcode is None else events[events['Barcode'] == barcode]
+    data = _events_for(events, 'Barcode', barcode)
     fig = px.scatter(data, x='Timestamp', y='Operator_ID', color='Device_ID', hover_data=['Flag'])
     return fig
 
 def session_drilldown(sessions, barcode):
-    data = sessions[sessions['Barcode'] == barcode]
+    data = _events_for(sessions, 'Barcode', barcode)
     fig = px.timeline(data, x_start='Timestamp', x_end='Timestamp', y='Operator_ID', color='Session_ID')
     return fig
 
@@ -96,8 +125,7 @@ def device_trend(df):
 
 
 def flag_pie(df):
-    flags = df[[c for c in df.columns if c in {"RAPID", "LOC_CONFLICT", "DEVICE_HOP"}]]
-    counts = flags.sum().reset_index()
+    counts = flag_frame(df)[FLAG_COLUMNS].sum().reset_index()
     counts.columns = ["Flag", "Count"]
     fig = px.pie(counts, values="Count", names="Flag")
     return fig
@@ -111,9 +139,13 @@ def interval_distribution(df):
     return fig
 
 
-def timeline_plot(df, column):
+def timeline_plot(df, column, key=None):
+    """Scatter of events over time, optionally for a single ``column`` key."""
+    data = _events_for(df, column, key)
+    if "Flagged" not in data.columns:
+        data = data.assign(Flagged=flag_view(data, "Flagged"))
     fig = px.scatter(
-        df.sort_values("Timestamp"),
+        data,
         x="Timestamp",
         y=column,
         color="Flagged",